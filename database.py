@@ -1,207 +1,225 @@
 import sys
-from abc import ABC, abstractmethod
-from typing import Optional, Dict, List, Type
+from collections import defaultdict
+from typing import Callable, Iterator, Optional, Dict, List, Set, Tuple
 
 
 class Database:
+    __slots__ = ("data", "_by_value", "_find_cache", "_undo", "_savepoints", "_logged")
+
     def __init__(self):
         self.data: Dict[str, str] = {}
-        self._counts: Dict[str, int] = {}
-        self.transactions: List[Dict[str, Optional[str]]] = []
+        # Subscripted only in _index to add a name; every other access uses
+        # get() so reads never create empty entries.
+        self._by_value: Dict[str, Set[str]] = defaultdict(set)
+        self._find_cache: Dict[str, Tuple[str, ...]] = {}
+        # Undo log shared by all open transactions: (name, value before the
+        # change). Each savepoint is the log length at BEGIN, paired with the
+        # names already logged since then.
+        self._undo: List[Tuple[str, Optional[str]]] = []
+        self._savepoints: List[int] = []
+        self._logged: List[Set[str]] = []
 
     def set(self, name: str, value: str) -> None:
-        old_value = self.data.get(name)
+        data = self.data
+        old_value = data.get(name)
+        if old_value == value:
+            return
 
-        if self.transactions:
-            self.transactions[-1][name] = old_value
+        if self._savepoints:
+            logged = self._logged[-1]
+            if name not in logged:
+                logged.add(name)
+                self._undo.append((name, old_value))
 
         if old_value is not None:
-            self._decrement_count(old_value)
+            self._unindex(name, old_value)
 
-        self.data[name] = value
-        self._increment_count(value)
+        data[name] = value
+        self._index(name, value)
 
     def get(self, name: str) -> str:
         return self.data.get(name, "NULL")
 
     def unset(self, name: str) -> None:
-        if name in self.data:
-            value = self.data[name]
+        data = self.data
+        value = data.get(name)
+        if value is None:
+            return
 
-            if self.transactions:
-                self.transactions[-1][name] = value
+        if self._savepoints:
+            logged = self._logged[-1]
+            if name not in logged:
+                logged.add(name)
+                self._undo.append((name, value))
 
-            self._decrement_count(value)
-            del self.data[name]
+        self._unindex(name, value)
+        del data[name]
 
     def get_counts(self, value: str) -> int:
-        return self._counts.get(value, 0)
-
-    def find(self, value: str) -> List[str]:
-        return sorted(name for name, val in self.data.items() if val == value)
+        return len(self._by_value.get(value, ()))
+
+    def find(self, value: str) -> Tuple[str, ...]:
+        # Cached as an immutable tuple, so it can be returned without a copy
+        result = self._find_cache.get(value)
+        if result is None:
+            names = self._by_value.get(value)
+            if not names:
+                return ()
+            result = self._find_cache[value] = tuple(sorted(names))
+        return result
 
     def begin(self) -> None:
-        self.transactions.append({})
+        self._savepoints.append(len(self._undo))
+        self._logged.append(set())
 
     def rollback(self) -> Optional[str]:
-        if not self.transactions:
+        if not self._savepoints:
             return None
 
-        current_txn = self.transactions[-1]
-        for name, old_value in current_txn.items():
+        start = self._savepoints.pop()
+        self._logged.pop()
+
+        # Nested COMMITs keep one entry per key in this range, so every entry
+        # holds the key's value as of this savepoint's BEGIN.
+        undo = self._undo
+        data = self.data
+        for name, old_value in undo[start:]:
+            current_value = data.get(name)
+            if current_value == old_value:
+                continue
+
+            if current_value is not None:
+                self._unindex(name, current_value)
+
             if old_value is None:
-                if name in self.data:
-                    self._decrement_count(self.data[name])
-                    del self.data[name]
+                del data[name]
             else:
-                if name in self.data:
-                    self._decrement_count(self.data[name])
-                self.data[name] = old_value
-                self._increment_count(old_value)
+                data[name] = old_value
+                self._index(name, old_value)
 
-        self.transactions.pop()
+        del undo[start:]
         return None
 
     def commit(self) -> Optional[str]:
-        if not self.transactions:
+        if not self._savepoints:
             return None
 
-        if len(self.transactions) > 1:
-            parent_txn = self.transactions[-2]
-            for name, value in self.transactions[-1].items():
-                if name not in parent_txn:
-                    parent_txn[name] = value
+        start = self._savepoints.pop()
+        child = self._logged.pop()
+        if not self._savepoints:
+            self._undo.clear()
+            return None
 
-        self.transactions.pop()
+        # The child's entries join the parent's range. Drop the ones for keys
+        # the parent already logged: the parent's entry is older.
+        parent = self._logged[-1]
+        if not parent.isdisjoint(child):
+            undo = self._undo
+            undo[start:] = [entry for entry in undo[start:] if entry[0] not in parent]
+        parent |= child
         return None
 
-    def _increment_count(self, value: str) -> None:
-        self._counts[value] = self._counts.get(value, 0) + 1
-
-    def _decrement_count(self, value: str) -> None:
-        self._counts[value] -= 1
-        if self._counts[value] == 0:
-            del self._counts[value]
-
-    def _remove_if_exists(self, name: str) -> None:
-        if name in self.data:
-            value = self.data[name]
-            self._decrement_count(value)
-            del self.data[name]
+    def _index(self, name: str, value: str) -> None:
+        self._find_cache.pop(value, None)
+        self._by_value[value].add(name)
 
-    def _restore_value(self, name: str, value: str) -> None:
-        current_value = self.data.get(name)
-        if current_value is not None:
-            self._decrement_count(current_value)
-        self.data[name] = value
-        self._increment_count(value)
+    def _unindex(self, name: str, value: str) -> None:
+        self._find_cache.pop(value, None)
+        by_value = self._by_value
+        names = by_value.get(value)
+        if names is None:
+            raise KeyError(value)
+        names.remove(name)
+        if not names:
+            del by_value[value]
 
 
-class Command(ABC):
-    @abstractmethod
-    def execute(self, db: Database, args: List[str]) -> Optional[str]:
-        pass
+Handler = Callable[[Database, List[str]], Optional[str]]
 
-    @staticmethod
-    def validate_args(args: List[str], expected: int) -> bool:
-        return len(args) == expected
 
-
-class SetCommand(Command):
-    def execute(self, db: Database, args: List[str]) -> Optional[str]:
-        if not self.validate_args(args, 2):
-            return "Wrong number of arguments for SET"
-        db.set(args[0], args[1])
-        return None
+def set_cmd(db: Database, args: List[str]) -> Optional[str]:
+    db.set(args[0], args[1])
+    return None
 
 
-class GetCommand(Command):
-    def execute(self, db: Database, args: List[str]) -> Optional[str]:
-        if not self.validate_args(args, 1):
-            return "Wrong number of arguments for GET"
-        return db.get(args[0])
+def get_cmd(db: Database, args: List[str]) -> Optional[str]:
+    return db.get(args[0])
 
 
-class UnsetCommand(Command):
-    def execute(self, db: Database, args: List[str]) -> Optional[str]:
-        if not self.validate_args(args, 1):
-            return "Wrong number of arguments for UNSET"
-        db.unset(args[0])
-        return None
+def unset_cmd(db: Database, args: List[str]) -> Optional[str]:
+    db.unset(args[0])
+    return None
 
 
-class CountsCommand(Command):
-    def execute(self, db: Database, args: List[str]) -> Optional[str]:
-        if not self.validate_args(args, 1):
-            return "Wrong number of arguments for COUNTS"
-        return str(db.get_counts(args[0]))
+def counts_cmd(db: Database, args: List[str]) -> Optional[str]:
+    return str(db.get_counts(args[0]))
 
 
-class BeginCommand(Command):
-    def execute(self, db: Database, args: List[str]) -> Optional[str]:
-        if not self.validate_args(args, 0):
-            return "BEGIN takes no arguments"
-        db.begin()
-        return None
+def begin_cmd(db: Database, args: List[str]) -> Optional[str]:
+    db.begin()
+    return None
 
 
-class RollbackCommand(Command):
-    def execute(self, db: Database, args: List[str]) -> Optional[str]:
-        if not self.validate_args(args, 0):
-            return "ROLLBACK takes no arguments"
-        return db.rollback()
+def rollback_cmd(db: Database, args: List[str]) -> Optional[str]:
+    return db.rollback()
 
 
-class CommitCommand(Command):
-    def execute(self, db: Database, args: List[str]) -> Optional[str]:
-        if not self.validate_args(args, 0):
-            return "COMMIT takes no arguments"
-        return db.commit()
+def commit_cmd(db: Database, args: List[str]) -> Optional[str]:
+    return db.commit()
 
 
-class FindCommand(Command):
-    def execute(self, db: Database, args: List[str]) -> Optional[str]:
-        if not self.validate_args(args, 1):
-            return "Wrong number of arguments for FIND"
-        result = db.find(args[0])
-        return " ".join(result) if result else "NULL"
+def find_cmd(db: Database, args: List[str]) -> Optional[str]:
+    result = db.find(args[0])
+    return " ".join(result) if result else "NULL"
 
 
-class EndCommand(Command):
-    def execute(self, db: Database, args: List[str]) -> Optional[str]:
-        if not self.validate_args(args, 0):
-            return "END takes no arguments"
-        sys.exit(0)
+def end_cmd(db: Database, args: List[str]) -> Optional[str]:
+    sys.exit(0)
 
 
 class CommandProcessor:
+    __slots__ = ("db", "commands")
+
     def __init__(self):
         self.db = Database()
-        self.commands: Dict[str, Type[Command]] = {
-            "SET": SetCommand,
-            "GET": GetCommand,
-            "UNSET": UnsetCommand,
-            "COUNTS": CountsCommand,
-            "FIND": FindCommand,
-            "BEGIN": BeginCommand,
-            "ROLLBACK": RollbackCommand,
-            "COMMIT": CommitCommand,
-            "END": EndCommand,
+        handlers: Dict[str, Tuple[int, Handler, str]] = {
+            "SET": (2, set_cmd, "Wrong number of arguments for SET"),
+            "GET": (1, get_cmd, "Wrong number of arguments for GET"),
+            "UNSET": (1, unset_cmd, "Wrong number of arguments for UNSET"),
+            "COUNTS": (1, counts_cmd, "Wrong number of arguments for COUNTS"),
+            "FIND": (1, find_cmd, "Wrong number of arguments for FIND"),
+            "BEGIN": (0, begin_cmd, "BEGIN takes no arguments"),
+            "ROLLBACK": (0, rollback_cmd, "ROLLBACK takes no arguments"),
+            "COMMIT": (0, commit_cmd, "COMMIT takes no arguments"),
+            "END": (0, end_cmd, "END takes no arguments"),
+        }
+        # Register lowercase spellings too so the common cases skip upper()
+        self.commands = {
+            key: entry
+            for name, entry in handlers.items()
+            for key in (name, name.lower())
         }
 
     def process(self, line: str) -> Optional[str]:
-        parts = line.strip().split()
+        # No command takes more than two arguments, so stop splitting after
+        # the third one: any longer line is rejected on argument count anyway.
+        parts = line.split(None, 3)
         if not parts:
             return None
 
         cmd, *args = parts
-        cmd = cmd.upper()
 
-        if cmd not in self.commands:
-            return "Unknown command"
+        entry = self.commands.get(cmd)
+        if entry is None:
+            entry = self.commands.get(cmd.upper())
+            if entry is None:
+                return "Unknown command"
+
+        expected, handler, error = entry
+        if len(args) != expected:
+            return error
 
-        command = self.commands[cmd]()
-        return command.execute(self.db, args)
+        return handler(self.db, args)
 
 
 def prompt(prefix: str = "> ") -> Optional[str]:
@@ -211,12 +229,27 @@ def prompt(prefix: str = "> ") -> Optional[str]:
         return None
 
 
+def read_lines() -> Iterator[str]:
+    if not sys.stdin.isatty():
+        # Piped input: read buffered lines without echoing a prompt per line
+        try:
+            yield from sys.stdin
+        except KeyboardInterrupt:
+            pass
+        return
+
+    while (line := prompt()) is not None:
+        yield line
+
+
 def main():
     processor = CommandProcessor()
+    process = processor.process
+    write = sys.stdout.write
 
-    while (line := prompt()) is not None:
-        if result := processor.process(line):
-            print(result)
+    for line in read_lines():
+        if result := process(line):
+            write(result + "\n")
 
 
 if __name__ == "__main__":
@@ -5,10 +5,10 @@ from unittest.mock import patch
 from database import (
     Database,
     CommandProcessor,
-    SetCommand,
-    GetCommand,
-    CountsCommand,
-    EndCommand,
+    set_cmd,
+    get_cmd,
+    counts_cmd,
+    end_cmd,
     main,
 )
 
@@ -39,9 +39,61 @@ class TestDatabase(unittest.TestCase):
         self.db.set("A", "10")
         self.db.set("B", "20")
         self.db.set("C", "10")
-        self.assertEqual(self.db.find("10"), ["A", "C"])
-        self.assertEqual(self.db.find("20"), ["B"])
-        self.assertEqual(self.db.find("30"), [])
+        self.assertEqual(self.db.find("10"), ("A", "C"))
+        self.assertEqual(self.db.find("20"), ("B",))
+        self.assertEqual(self.db.find("30"), ())
+
+    def test_find_after_changes(self):
+        self.db.set("A", "10")
+        self.db.set("B", "10")
+        self.db.set("A", "20")
+        self.assertEqual(self.db.find("10"), ("B",))
+        self.assertEqual(self.db.find("20"), ("A",))
+
+        self.db.begin()
+        self.db.unset("B")
+        self.db.set("C", "20")
+        self.assertEqual(self.db.find("10"), ())
+        self.assertEqual(self.db.find("20"), ("A", "C"))
+
+        self.db.rollback()
+        self.assertEqual(self.db.find("10"), ("B",))
+        self.assertEqual(self.db.find("20"), ("A",))
+        self.assertEqual(self.db.get_counts("20"), 1)
+
+    def test_find_cache(self):
+        self.db.set("A", "10")
+        self.assertEqual(self.db.find("10"), ("A",))
+        self.assertEqual(self.db.find("10"), ("A",))
+
+        self.db.set("B", "10")
+        self.assertEqual(self.db.find("10"), ("A", "B"))
+        self.db.unset("A")
+        self.assertEqual(self.db.find("10"), ("B",))
+        self.db.unset("B")
+        self.assertEqual(self.db.find("10"), ())
+
+    def test_find_result_is_independent(self):
+        self.db.set("A", "10")
+        result = self.db.find("10")
+        self.db.set("B", "10")
+        self.assertEqual(result, ("A",))
+        self.assertEqual(self.db.find("10"), ("A", "B"))
+        self.assertIs(self.db.find("10"), self.db.find("10"))
+
+    def test_writes_after_find(self):
+        self.db.set("A", "10")
+        self.assertEqual(self.db.find("10"), ("A",))
+
+        names = ["N%d" % i for i in range(1000)]
+        for name in reversed(names):
+            self.db.set(name, "10")
+        self.assertEqual(self.db.find("10"), tuple(sorted(names + ["A"])))
+
+        for name in names[::2]:
+            self.db.unset(name)
+        self.assertEqual(self.db.find("10"), tuple(sorted(names[1::2] + ["A"])))
+        self.assertEqual(self.db.get_counts("10"), 501)
 
     def test_transactions_commit(self):
         self.db.begin()
@@ -56,6 +108,58 @@ class TestDatabase(unittest.TestCase):
         self.db.rollback()
         self.assertEqual(self.db.get("A"), "NULL")
 
+    def test_rollback_repeated_changes(self):
+        self.db.set("A", "10")
+        self.db.begin()
+        self.db.set("A", "20")
+        self.db.set("A", "30")
+        self.db.unset("A")
+        self.db.set("A", "40")
+        self.db.rollback()
+        self.assertEqual(self.db.get("A"), "10")
+        self.assertEqual(self.db.find("10"), ("A",))
+        self.assertEqual(self.db.get_counts("40"), 0)
+
+    def test_rollback_after_nested_commit(self):
+        self.db.set("A", "10")
+        self.db.begin()
+        self.db.set("A", "20")
+        self.db.begin()
+        self.db.set("A", "30")
+        self.db.set("B", "30")
+        self.db.commit()
+        self.db.unset("A")
+        self.db.rollback()
+        self.assertEqual(self.db.get("A"), "10")
+        self.assertEqual(self.db.get("B"), "NULL")
+        self.assertEqual(self.db.find("30"), ())
+
+    def test_undo_log_internals_bounded_across_nested_commits(self):
+        # Reaches into _undo: log growth is not observable through the API
+        self.db.set("A", "0")
+        self.db.begin()
+        for value in ("1", "2", "3", "4", "5"):
+            self.db.begin()
+            self.db.set("A", value)
+            self.db.commit()
+        self.assertEqual(len(self.db._undo), 1)
+
+        self.db.set("A", "6")
+        self.assertEqual(len(self.db._undo), 1)
+        self.db.rollback()
+        self.assertEqual(self.db.get("A"), "0")
+        self.assertEqual(self.db.find("0"), ("A",))
+
+    def test_set_same_value(self):
+        self.db.set("A", "10")
+        self.db.begin()
+        self.db.set("A", "10")
+        self.db.set("A", "20")
+        self.db.rollback()
+        self.assertEqual(self.db.get("A"), "10")
+        self.assertEqual(self.db.get_counts("10"), 1)
+        self.assertEqual(self.db.find("10"), ("A",))
+
     def test_nested_transactions(self):
         # level 1
         self.db.begin()
@@ -95,32 +199,21 @@ class TestCommands(unittest.TestCase):
         self.processor.db = self.db
 
     def test_set_command(self):
-        cmd = SetCommand()
-        cmd.execute(self.db, ["A", "10"])
+        set_cmd(self.db, ["A", "10"])
         self.assertEqual(self.db.get("A"), "10")
-        self.assertEqual(
-            cmd.execute(self.db, ["A"]), "Wrong number of arguments for SET"
-        )
 
     def test_get_command(self):
         self.db.set("A", "10")
-        cmd = GetCommand()
-        self.assertEqual(cmd.execute(self.db, ["A"]), "10")
-        self.assertEqual(cmd.execute(self.db, []), "Wrong number of arguments for GET")
+        self.assertEqual(get_cmd(self.db, ["A"]), "10")
 
     def test_counts_command(self):
         self.db.set("A", "10")
         self.db.set("B", "10")
-        cmd = CountsCommand()
-        self.assertEqual(cmd.execute(self.db, ["10"]), "2")
-        self.assertEqual(
-            cmd.execute(self.db, ["10", "20"]), "Wrong number of arguments for COUNTS"
-        )
+        self.assertEqual(counts_cmd(self.db, ["10"]), "2")
 
     def test_end_command(self):
-        cmd = EndCommand()
         with self.assertRaises(SystemExit):
-            cmd.execute(self.db, [])
+            end_cmd(self.db, [])
 
 
 class TestCommandProcessor(unittest.TestCase):
@@ -134,6 +227,11 @@ class TestCommandProcessor(unittest.TestCase):
         self.assertEqual(self.processor.process("UNSET A"), None)
         self.assertEqual(self.processor.process("GET A"), "NULL")
 
+    def test_command_case(self):
+        self.assertEqual(self.processor.process("set A 10"), None)
+        self.assertEqual(self.processor.process("Get A"), "10")
+        self.assertEqual(self.processor.process("get A"), "10")
+
     def test_invalid_commands(self):
         self.assertEqual(
             self.processor.process("SET A"), "Wrong number of arguments for SET"
@@ -141,6 +239,15 @@ class TestCommandProcessor(unittest.TestCase):
         self.assertEqual(
             self.processor.process("GET"), "Wrong number of arguments for GET"
         )
+        self.assertEqual(
+            self.processor.process("SET A 10 20 30"),
+            "Wrong number of arguments for SET",
+        )
+        self.assertEqual(
+            self.processor.process("COUNTS 10 20"),
+            "Wrong number of arguments for COUNTS",
+        )
+        self.assertEqual(self.processor.process("END 1"), "END takes no arguments")
         self.assertEqual(self.processor.process("UNKNOWN"), "Unknown command")
 
     def test_transaction_commands(self):
@@ -169,7 +276,10 @@ class TestIntegration(unittest.TestCase):
 
         expected_output = ["NULL", "10", "1", "2", "NULL"]
 
-        with patch("builtins.input", side_effect=inputs):
+        with patch("sys.stdin") as mock_stdin, patch(
+            "builtins.input", side_effect=inputs
+        ):
+            mock_stdin.isatty.return_value = True
             try:
                 main()
             except SystemExit:
@@ -178,6 +288,15 @@ class TestIntegration(unittest.TestCase):
         output = mock_stdout.getvalue().strip().split("\n")
         self.assertEqual(output, expected_output)
 
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_piped_input(self, mock_stdout):
+        inputs = "SET A 10\nSET B 10\nFIND 10\nGET C\n"
+
+        with patch("sys.stdin", StringIO(inputs)):
+            main()
+
+        self.assertEqual(mock_stdout.getvalue(), "A B\nNULL\n")
+
 
 if __name__ == "__main__":
     unittest.main()